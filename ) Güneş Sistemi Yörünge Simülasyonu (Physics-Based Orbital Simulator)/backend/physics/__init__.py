@@ -1,2 +1,2 @@
-# Physics package
-
+# Physics package
+
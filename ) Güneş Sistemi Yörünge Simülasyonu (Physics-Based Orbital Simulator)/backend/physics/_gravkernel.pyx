@@ -0,0 +1,50 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Pairwise gravity kernel (Cython)
+Optional - build in place with: python setup.py build_ext --inplace
+"""
+from libc.math cimport sqrt
+
+
+def accel_all(
+    const double[:, ::1] pos,
+    const double[::1] gm,
+    double eps2,
+    double[:, ::1] out
+):
+    """
+    Pairwise gravitational acceleration for all bodies
+    a_i = Σ G*m_j * (r_j - r_i) / |r_j - r_i|³, written into out (N, 3)
+    gm holds the precomputed G*m_j per body
+    Each pair is evaluated once and applied to both bodies (F_ji = -F_ij)
+    """
+    cdef Py_ssize_t i, j, N = pos.shape[0]
+    cdef double ax, ay, az, xi, yi, zi, gmi
+    cdef double dx, dy, dz, r2, c, ci, cj
+    with nogil:
+        out[:, :] = 0.0
+        for i in range(N):
+            ax = 0.0
+            ay = 0.0
+            az = 0.0
+            xi = pos[i, 0]
+            yi = pos[i, 1]
+            zi = pos[i, 2]
+            gmi = gm[i]
+            for j in range(i + 1, N):
+                dx = pos[j, 0] - xi
+                dy = pos[j, 1] - yi
+                dz = pos[j, 2] - zi
+                r2 = dx * dx + dy * dy + dz * dz + eps2
+                c = 1.0 / (r2 * sqrt(r2))
+                ci = gm[j] * c
+                cj = gmi * c
+                ax += dx * ci
+                ay += dy * ci
+                az += dz * ci
+                out[j, 0] -= dx * cj
+                out[j, 1] -= dy * cj
+                out[j, 2] -= dz * cj
+            out[i, 0] += ax
+            out[i, 1] += ay
+            out[i, 2] += az
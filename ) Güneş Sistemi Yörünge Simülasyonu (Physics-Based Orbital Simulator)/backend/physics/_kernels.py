@@ -0,0 +1,62 @@
+"""
+Compiled gravity kernels (Numba)
+Without Numba the decorators are no-ops and the simulator falls back to
+the vectorized NumPy implementation in gravity.py
+"""
+import math
+import os
+
+try:
+    from numba import config, njit, prange
+    NUMBA_AVAILABLE = True
+    # The parallel Barnes-Hut kernel runs on the background physics thread;
+    # under the TBB layer the interpreter then hangs at exit. Calls are
+    # serialized by the simulator lock, so the built-in workqueue layer is enough.
+    if "NUMBA_THREADING_LAYER" not in os.environ:
+        config.THREADING_LAYER = "workqueue"
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+@njit(fastmath=True, cache=True, nogil=True)
+def accel_all(pos, gm, eps2, out):
+    """
+    Pairwise gravitational acceleration for all bodies
+    a_i = Σ G*m_j * (r_j - r_i) / |r_j - r_i|³, written into out (N, 3)
+    gm holds the precomputed G*m_j per body
+    Each pair is evaluated once and applied to both bodies (F_ji = -F_ij)
+    """
+    N = pos.shape[0]
+    out[:, :] = 0.0
+    for i in range(N):
+        ax = 0.0
+        ay = 0.0
+        az = 0.0
+        xi = pos[i, 0]
+        yi = pos[i, 1]
+        zi = pos[i, 2]
+        gmi = gm[i]
+        for j in range(i + 1, N):
+            dx = pos[j, 0] - xi
+            dy = pos[j, 1] - yi
+            dz = pos[j, 2] - zi
+            r2 = dx * dx + dy * dy + dz * dz + eps2
+            c = 1.0 / (r2 * math.sqrt(r2))
+            ci = gm[j] * c
+            cj = gmi * c
+            ax += dx * ci
+            ay += dy * ci
+            az += dz * ci
+            out[j, 0] -= dx * cj
+            out[j, 1] -= dy * cj
+            out[j, 2] -= dz * cj
+        out[i, 0] += ax
+        out[i, 1] += ay
+        out[i, 2] += az
@@ -0,0 +1,208 @@
+"""
+Barnes-Hut tree code for large N
+Distant groups of bodies are replaced by their center of mass when
+width / distance < θ, reducing the force sum from O(N²) to O(N log N)
+"""
+import math
+import numpy as np
+from ._kernels import njit, prange
+from .constants import G, SOFTENING_SQ
+
+# Deepest level a cell may be split to; bodies closer than
+# root_width / 2**MAX_DEPTH share one aggregate leaf
+MAX_DEPTH = 48
+
+# body_index marker for internal nodes and aggregate leaves
+INTERNAL = -1
+AGGREGATE = -2
+
+
+@njit(cache=True, nogil=True)
+def _build_tree(pos, mass, child, parent, body, center, width, node_mass, node_com):
+    """
+    Build the octree top-down by inserting bodies one at a time.
+    Node arrays must be preallocated with the same capacity K.
+    Returns the number of nodes used, or -1 if K was too small.
+    """
+    N = pos.shape[0]
+    K = child.shape[0]
+    
+    # Root cell: cube around the bounding box
+    lo_x = hi_x = pos[0, 0]
+    lo_y = hi_y = pos[0, 1]
+    lo_z = hi_z = pos[0, 2]
+    for b in range(1, N):
+        lo_x = min(lo_x, pos[b, 0])
+        hi_x = max(hi_x, pos[b, 0])
+        lo_y = min(lo_y, pos[b, 1])
+        hi_y = max(hi_y, pos[b, 1])
+        lo_z = min(lo_z, pos[b, 2])
+        hi_z = max(hi_z, pos[b, 2])
+    child[0, :] = -1
+    parent[0] = -1
+    body[0] = INTERNAL
+    center[0, 0] = 0.5 * (lo_x + hi_x)
+    center[0, 1] = 0.5 * (lo_y + hi_y)
+    center[0, 2] = 0.5 * (lo_z + hi_z)
+    width[0] = max(hi_x - lo_x, hi_y - lo_y, hi_z - lo_z) * 1.0001 + 1.0
+    node_mass[0] = 0.0
+    node_com[0, :] = 0.0
+    n_nodes = 1
+    
+    for b in range(N):
+        node = 0
+        depth = 0
+        while True:
+            if body[node] == AGGREGATE:
+                node_mass[node] += mass[b]
+                for k in range(3):
+                    node_com[node, k] += mass[b] * pos[b, k]
+                break
+            
+            if body[node] >= 0:
+                # Occupied leaf: split it, or merge if already at max depth
+                if depth >= MAX_DEPTH:
+                    body[node] = AGGREGATE
+                    node_mass[node] += mass[b]
+                    for k in range(3):
+                        node_com[node, k] += mass[b] * pos[b, k]
+                    break
+                if n_nodes >= K:
+                    return -1
+                e = body[node]
+                body[node] = INTERNAL
+                node_mass[node] = 0.0
+                node_com[node, :] = 0.0
+                octant = 0
+                for k in range(3):
+                    if pos[e, k] >= center[node, k]:
+                        octant |= 1 << k
+                c = n_nodes
+                n_nodes += 1
+                child[c, :] = -1
+                parent[c] = node
+                body[c] = e
+                width[c] = 0.5 * width[node]
+                for k in range(3):
+                    offset = 0.25 * width[node]
+                    center[c, k] = center[node, k] + (offset if octant & (1 << k) else -offset)
+                node_mass[c] = mass[e]
+                for k in range(3):
+                    node_com[c, k] = mass[e] * pos[e, k]
+                child[node, octant] = c
+            
+            # Internal node: descend, creating a leaf if the octant is empty
+            octant = 0
+            for k in range(3):
+                if pos[b, k] >= center[node, k]:
+                    octant |= 1 << k
+            c = child[node, octant]
+            if c == -1:
+                if n_nodes >= K:
+                    return -1
+                c = n_nodes
+                n_nodes += 1
+                child[c, :] = -1
+                parent[c] = node
+                body[c] = b
+                width[c] = 0.5 * width[node]
+                for k in range(3):
+                    offset = 0.25 * width[node]
+                    center[c, k] = center[node, k] + (offset if octant & (1 << k) else -offset)
+                node_mass[c] = mass[b]
+                for k in range(3):
+                    node_com[c, k] = mass[b] * pos[b, k]
+                child[node, octant] = c
+                break
+            node = c
+            depth += 1
+    
+    # Bottom-up mass/COM: children always have larger indices than parents
+    for node in range(n_nodes - 1, 0, -1):
+        p = parent[node]
+        node_mass[p] += node_mass[node]
+        for k in range(3):
+            node_com[p, k] += node_com[node, k]
+    for node in range(n_nodes):
+        if body[node] >= 0:
+            # Exact position, so a body's own leaf gives dx = 0
+            for k in range(3):
+                node_com[node, k] = pos[body[node], k]
+        elif node_mass[node] > 0.0:
+            for k in range(3):
+                node_com[node, k] /= node_mass[node]
+    
+    return n_nodes
+
+
+@njit(parallel=True, fastmath=True, cache=True, nogil=True)
+def _accel_bh(pos, child, body, width, node_mass, node_com, theta, G, eps2, out):
+    """Walk the tree for every body with an explicit stack"""
+    N = pos.shape[0]
+    theta2 = theta * theta
+    for i in prange(N):
+        stack = np.empty(8 * MAX_DEPTH + 8, dtype=np.int64)
+        stack[0] = 0
+        top = 1
+        ax = 0.0
+        ay = 0.0
+        az = 0.0
+        while top > 0:
+            top -= 1
+            node = stack[top]
+            # A body's own leaf adds nothing: dx = 0 and eps2 > 0
+            if node_mass[node] == 0.0:
+                continue
+            dx = node_com[node, 0] - pos[i, 0]
+            dy = node_com[node, 1] - pos[i, 1]
+            dz = node_com[node, 2] - pos[i, 2]
+            r2 = dx * dx + dy * dy + dz * dz + eps2
+            if body[node] != INTERNAL or width[node] * width[node] < theta2 * r2:
+                inv = node_mass[node] / (r2 * math.sqrt(r2))
+                ax += dx * inv
+                ay += dy * inv
+                az += dz * inv
+            else:
+                for k in range(8):
+                    c = child[node, k]
+                    if c != -1:
+                        stack[top] = c
+                        top += 1
+        out[i, 0] = G * ax
+        out[i, 1] = G * ay
+        out[i, 2] = G * az
+
+
+def barnes_hut_accelerations(
+    pos: np.ndarray,
+    mass: np.ndarray,
+    theta: float = 0.5,
+    eps2: float = SOFTENING_SQ,
+    out: np.ndarray = None
+) -> np.ndarray:
+    """
+    Approximate gravitational acceleration for all bodies
+    pos: (N, 3) positions, mass: (N,) masses -> (N, 3) accelerations
+    """
+    N = pos.shape[0]
+    if out is None:
+        out = np.empty((N, 3))
+    if N == 0:
+        return out
+    
+    capacity = 4 * N + 64
+    while True:
+        child = np.empty((capacity, 8), dtype=np.int64)
+        parent = np.empty(capacity, dtype=np.int64)
+        body = np.empty(capacity, dtype=np.int64)
+        center = np.empty((capacity, 3))
+        width = np.empty(capacity)
+        node_mass = np.empty(capacity)
+        node_com = np.empty((capacity, 3))
+        n_nodes = _build_tree(pos, mass, child, parent, body, center, width, node_mass, node_com)
+        if n_nodes >= 0:
+            break
+        capacity *= 2
+    
+    _accel_bh(pos, child, body, width, node_mass, node_com, theta, G, eps2, out)
+    return out
@@ -1,131 +1,233 @@
-"""
-Newtonian gravity calculations
-F = G * (m1 * m2) / r²
-"""
-import numpy as np
-from typing import List
-from .vector3d import Vector3D
-from .constants import G
-
-
-class CelestialBody:
-    """Celestial body (planet, asteroid, etc.)"""
-    
-    def __init__(
-        self,
-        name: str,
-        mass: float,
-        position: Vector3D,
-        velocity: Vector3D,
-        radius: float = 0.0,
-        color: str = "#ffffff"
-    ):
-        self.name = name
-        self.mass = float(mass)  # kg
-        self.position = position
-        self.velocity = velocity
-        self.radius = float(radius)  # meters (for visualization)
-        self.color = color
-        self.trajectory: List[Vector3D] = []
-        self.acceleration = Vector3D(0, 0, 0)
-    
-    def calculate_gravitational_force(
-        self,
-        other: 'CelestialBody'
-    ) -> Vector3D:
-        """
-        Calculate gravitational force from another body
-        F = G * (m1 * m2) / r² * r̂
-        """
-        # Position vector from self to other
-        r_vector = other.position - self.position
-        r = r_vector.magnitude()
-        
-        # Avoid division by zero
-        if r < 1e-6:
-            return Vector3D(0, 0, 0)
-        
-        # Unit vector in direction of force
-        r_hat = r_vector.normalize()
-        
-        # Gravitational force magnitude
-        force_magnitude = G * self.mass * other.mass / (r * r)
-        
-        # Force vector
-        force = r_hat * force_magnitude
-        
-        return force
-    
-    def calculate_acceleration(
-        self,
-        bodies: List['CelestialBody']
-    ) -> Vector3D:
-        """
-        Calculate total acceleration from all other bodies
-        a = F / m = Σ(G * m_other / r² * r̂)
-        """
-        total_force = Vector3D(0, 0, 0)
-        
-        for body in bodies:
-            if body is self:
-                continue
-            
-            force = self.calculate_gravitational_force(body)
-            total_force = total_force + force
-        
-        # Acceleration = Force / Mass
-        acceleration = total_force / self.mass
-        self.acceleration = acceleration
-        
-        return acceleration
-    
-    def update_position(self, dt: float):
-        """Update position using velocity"""
-        self.position = self.position + self.velocity * dt
-    
-    def update_velocity(self, dt: float):
-        """Update velocity using acceleration"""
-        self.velocity = self.velocity + self.acceleration * dt
-    
-    def get_kinetic_energy(self) -> float:
-        """Calculate kinetic energy: KE = 0.5 * m * v²"""
-        v = self.velocity.magnitude()
-        return 0.5 * self.mass * v * v
-    
-    def get_potential_energy(self, sun: 'CelestialBody') -> float:
-        """Calculate potential energy: PE = -G * m * M / r"""
-        r_vector = self.position - sun.position
-        r = r_vector.magnitude()
-        if r < 1e-6:
-            return float('-inf')
-        return -G * self.mass * sun.mass / r
-    
-    def get_total_energy(self, sun: 'CelestialBody') -> float:
-        """Total energy: E = KE + PE"""
-        return self.get_kinetic_energy() + self.get_potential_energy(sun)
-    
-    def to_dict(self) -> dict:
-        """Convert to dictionary for API"""
-        return {
-            "name": self.name,
-            "mass": self.mass,
-            "position": self.position.to_dict(),
-            "velocity": self.velocity.to_dict(),
-            "radius": self.radius,
-            "color": self.color,
-            "acceleration": self.acceleration.to_dict()
-        }
-
-
-def create_sun() -> CelestialBody:
-    """Create the Sun"""
-    from .constants import SOLAR_MASS
-    return CelestialBody(
-        name="Sun",
-        mass=SOLAR_MASS,
-        position=Vector3D(0, 0, 0),
-        velocity=Vector3D(0, 0, 0),
-        radius=6.96e8,  # Solar radius in meters
-        color="#FFD700"
-    )
-
+"""
+Newtonian gravity calculations
+F = G * (m1 * m2) / r²
+"""
+import math
+import numpy as np
+from typing import List, Optional
+from .vector3d import Vector3D
+from .constants import G, SOFTENING_SQ
+
+
+def compute_accelerations(
+    pos: np.ndarray,
+    mass: np.ndarray,
+    eps2: float = SOFTENING_SQ
+) -> np.ndarray:
+    """
+    Vectorized gravitational acceleration for all bodies
+    a_i = Σ G * m_j * (r_j - r_i) / |r_j - r_i|³
+    pos: (N, 3) positions, mass: (N,) masses -> (N, 3) accelerations
+    """
+    diff = pos[None, :, :] - pos[:, None, :]
+    r2 = (diff ** 2).sum(-1) + eps2
+    inv_r3 = r2 ** -1.5
+    return G * (diff * inv_r3[..., None] * mass[None, :, None]).sum(axis=1)
+
+
+class CelestialBody:
+    """Celestial body (planet, asteroid, etc.)"""
+    
+    def __init__(
+        self,
+        name: str,
+        mass: float,
+        position: Vector3D,
+        velocity: Vector3D,
+        radius: float = 0.0,
+        color: str = "#ffffff"
+    ):
+        self.name = name
+        self.mass = float(mass)  # kg
+        self.radius = float(radius)  # meters (for visualization)
+        self.color = color
+        # Positions kept from the last owner; while attached, the owner's
+        # trajectory buffer is used instead
+        self.traj: Optional[np.ndarray] = None
+        # Owning simulator and row index into its state arrays (None = standalone)
+        self._owner = None
+        self._index = -1
+        # Own copies, so in-place updates never touch the caller's vectors
+        self._position = Vector3D(position.x, position.y, position.z)
+        self._velocity = Vector3D(velocity.x, velocity.y, velocity.z)
+        self._acceleration = Vector3D(0, 0, 0)
+    
+    def attach(self, owner, index: int):
+        """Bind state to row `index` of the owner's pos/vel/acc arrays"""
+        self._owner = owner
+        self._index = index
+    
+    def detach(self):
+        """Copy state back out of the owner's arrays and unbind"""
+        if self._owner is None:
+            return
+        self.traj = self.trajectory_array()
+        self._position = self.position
+        self._velocity = self.velocity
+        self._acceleration = self.acceleration
+        self._owner = None
+        self._index = -1
+    
+    @property
+    def position(self) -> Vector3D:
+        if self._owner is None:
+            return self._position
+        return Vector3D.from_array(self._owner.pos[self._index])
+    
+    @position.setter
+    def position(self, value: Vector3D):
+        if self._owner is None:
+            self._position = Vector3D(value.x, value.y, value.z)
+        else:
+            self._owner.pos[self._index] = self._owner.xp.asarray((value.x, value.y, value.z))
+    
+    @property
+    def velocity(self) -> Vector3D:
+        if self._owner is None:
+            return self._velocity
+        return Vector3D.from_array(self._owner.vel[self._index])
+    
+    @velocity.setter
+    def velocity(self, value: Vector3D):
+        if self._owner is None:
+            self._velocity = Vector3D(value.x, value.y, value.z)
+        else:
+            self._owner.vel[self._index] = self._owner.xp.asarray((value.x, value.y, value.z))
+    
+    @property
+    def acceleration(self) -> Vector3D:
+        if self._owner is None:
+            return self._acceleration
+        return Vector3D.from_array(self._owner.acc[self._index])
+    
+    @acceleration.setter
+    def acceleration(self, value: Vector3D):
+        if self._owner is None:
+            self._acceleration = value
+        else:
+            self._owner.acc[self._index] = self._owner.xp.asarray((value.x, value.y, value.z))
+    
+    def trajectory_array(self) -> np.ndarray:
+        """Recorded positions, oldest first, as an (n, 3) array"""
+        if self._owner is not None:
+            return self._owner.trajectory_array(self._index)
+        if self.traj is None:
+            return np.empty((0, 3))
+        return self.traj
+    
+    def get_trajectory(self) -> List[dict]:
+        """Recorded positions, oldest first, as dictionaries"""
+        return [{"x": x, "y": y, "z": z} for x, y, z in self.trajectory_array().tolist()]
+    
+    def calculate_gravitational_force(
+        self,
+        other: 'CelestialBody'
+    ) -> Vector3D:
+        """
+        Calculate gravitational force from another body
+        F = G * (m1 * m2) / r² * r̂
+        """
+        # Position vector from self to other
+        p = self.position
+        q = other.position
+        dx = q.x - p.x
+        dy = q.y - p.y
+        dz = q.z - p.z
+        r2 = dx * dx + dy * dy + dz * dz
+        
+        # Avoid division by zero
+        if r2 < 1e-12:
+            return Vector3D(0, 0, 0)
+        
+        # G * m1 * m2 / r² * r̂ = G * m1 * m2 / r³ * r_vector
+        inv_r3 = G * self.mass * other.mass / (r2 * math.sqrt(r2))
+        return Vector3D(dx * inv_r3, dy * inv_r3, dz * inv_r3)
+    
+    def calculate_acceleration(
+        self,
+        bodies: List['CelestialBody']
+    ) -> Vector3D:
+        """
+        Calculate total acceleration from all other bodies
+        a = F / m = Σ(G * m_other / r² * r̂)
+        """
+        ax = ay = az = 0.0
+        p = self.position
+        
+        for body in bodies:
+            q = body.position
+            dx = q.x - p.x
+            dy = q.y - p.y
+            dz = q.z - p.z
+            r2 = dx * dx + dy * dy + dz * dz
+            # Also skips self, where dx = dy = dz = 0
+            if r2 < 1e-12:
+                continue
+            
+            # m_self cancels: a = G * m_other / r³ * r_vector
+            s = G * body.mass / (r2 * math.sqrt(r2))
+            ax += dx * s
+            ay += dy * s
+            az += dz * s
+        
+        acceleration = Vector3D(ax, ay, az)
+        self.acceleration = acceleration
+        
+        return acceleration
+    
+    def update_position(self, dt: float):
+        """Update position using velocity"""
+        if self._owner is None:
+            self._position.iadd_scaled(self._velocity, dt)
+        else:
+            self.position = self.position.iadd_scaled(self.velocity, dt)
+    
+    def update_velocity(self, dt: float):
+        """Update velocity using acceleration"""
+        if self._owner is None:
+            self._velocity.iadd_scaled(self._acceleration, dt)
+        else:
+            self.velocity = self.velocity.iadd_scaled(self.acceleration, dt)
+    
+    def get_kinetic_energy(self) -> float:
+        """Calculate kinetic energy: KE = 0.5 * m * v²"""
+        v = self.velocity.magnitude()
+        return 0.5 * self.mass * v * v
+    
+    def get_potential_energy(self, sun: 'CelestialBody') -> float:
+        """Calculate potential energy: PE = -G * m * M / r"""
+        r_vector = self.position - sun.position
+        r = r_vector.magnitude()
+        if r < 1e-6:
+            return float('-inf')
+        return -G * self.mass * sun.mass / r
+    
+    def get_total_energy(self, sun: 'CelestialBody') -> float:
+        """Total energy: E = KE + PE"""
+        return self.get_kinetic_energy() + self.get_potential_energy(sun)
+    
+    def to_dict(self) -> dict:
+        """Convert to dictionary for API"""
+        return {
+            "name": self.name,
+            "mass": self.mass,
+            "position": self.position.to_dict(),
+            "velocity": self.velocity.to_dict(),
+            "radius": self.radius,
+            "color": self.color,
+            "acceleration": self.acceleration.to_dict()
+        }
+
+
+def create_sun() -> CelestialBody:
+    """Create the Sun"""
+    from .constants import SOLAR_MASS
+    return CelestialBody(
+        name="Sun",
+        mass=SOLAR_MASS,
+        position=Vector3D(0, 0, 0),
+        velocity=Vector3D(0, 0, 0),
+        radius=6.96e8,  # Solar radius in meters
+        color="#FFD700"
+    )
+
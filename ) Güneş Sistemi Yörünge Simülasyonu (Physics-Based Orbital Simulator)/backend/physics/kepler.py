@@ -1,181 +1,279 @@
-"""
-Kepler's Laws calculations
-1. Elliptical orbits
-2. Equal area in equal time
-3. T² ∝ a³
-"""
-import numpy as np
-from typing import Tuple, Optional
-from .vector3d import Vector3D
-from .constants import G, MU_SUN, AU
-
-
-def calculate_orbital_elements(
-    position: Vector3D,
-    velocity: Vector3D,
-    sun_mass: float
-) -> dict:
-    """
-    Calculate orbital elements from position and velocity
-    Returns: a, e, i, Ω, ω, ν (semi-major axis, eccentricity, inclination, etc.)
-    """
-    mu = G * sun_mass
-    
-    # Position and velocity vectors
-    r = position.magnitude()
-    v = velocity.magnitude()
-    
-    # Specific angular momentum
-    h_vector = position.cross(velocity)
-    h = h_vector.magnitude()
-    
-    # Specific energy
-    energy = 0.5 * v * v - mu / r
-    
-    # Semi-major axis
-    if energy >= 0:
-        # Hyperbolic orbit
-        a = -mu / (2 * energy)
-    else:
-        # Elliptical orbit
-        a = -mu / (2 * energy)
-    
-    # Eccentricity
-    e_vector = (velocity.cross(h_vector) / mu) - position.normalize()
-    e = e_vector.magnitude()
-    
-    # Inclination (angle from z-axis)
-    i = np.arccos(h_vector.z / h) if h > 0 else 0
-    
-    # Longitude of ascending node
-    n_vector = Vector3D(0, 0, 1).cross(h_vector)
-    n = n_vector.magnitude()
-    if n > 0:
-        Omega = np.arccos(n_vector.x / n)
-        if n_vector.y < 0:
-            Omega = 2 * np.pi - Omega
-    else:
-        Omega = 0
-    
-    # Argument of periapsis
-    if n > 0 and e > 0:
-        omega = np.arccos((n_vector.dot(e_vector)) / (n * e))
-        if e_vector.z < 0:
-            omega = 2 * np.pi - omega
-    else:
-        omega = 0
-    
-    # True anomaly
-    if e > 0:
-        nu = np.arccos((e_vector.dot(position)) / (e * r))
-        if position.dot(velocity) < 0:
-            nu = 2 * np.pi - nu
-    else:
-        nu = 0
-    
-    # Orbital period (Kepler's third law)
-    if a > 0:
-        period = 2 * np.pi * np.sqrt(a**3 / mu)
-    else:
-        period = float('inf')
-    
-    return {
-        "semi_major_axis": a,
-        "eccentricity": e,
-        "inclination": np.degrees(i),
-        "longitude_of_ascending_node": np.degrees(Omega),
-        "argument_of_periapsis": np.degrees(omega),
-        "true_anomaly": np.degrees(nu),
-        "period": period,
-        "periapsis": a * (1 - e) if e < 1 else None,
-        "apoapsis": a * (1 + e) if e < 1 else None
-    }
-
-
-def calculate_orbital_velocity(
-    distance: float,
-    sun_mass: float,
-    circular: bool = False
-) -> float:
-    """
-    Calculate orbital velocity at given distance
-    For circular orbit: v = sqrt(G * M / r)
-    """
-    mu = G * sun_mass
-    if circular:
-        return np.sqrt(mu / distance)
-    else:
-        # For elliptical orbit, this is approximate
-        return np.sqrt(mu * (2 / distance - 1 / distance))
-
-
-def kepler_equation_solver(
-    mean_anomaly: float,
-    eccentricity: float,
-    tolerance: float = 1e-10,
-    max_iterations: int = 100
-) -> float:
-    """
-    Solve Kepler's equation: M = E - e * sin(E)
-    Returns eccentric anomaly
-    """
-    if eccentricity < 1e-6:
-        return mean_anomaly
-    
-    E = mean_anomaly
-    for _ in range(max_iterations):
-        E_new = mean_anomaly + eccentricity * np.sin(E)
-        if abs(E_new - E) < tolerance:
-            return E_new
-        E = E_new
-    
-    return E
-
-
-def predict_position_from_elements(
-    orbital_elements: dict,
-    time: float,
-    sun_mass: float
-) -> Vector3D:
-    """
-    Predict position from orbital elements at given time
-    Uses Kepler's equations
-    """
-    a = orbital_elements["semi_major_axis"]
-    e = orbital_elements["eccentricity"]
-    i = np.radians(orbital_elements["inclination"])
-    Omega = np.radians(orbital_elements["longitude_of_ascending_node"])
-    omega = np.radians(orbital_elements["argument_of_periapsis"])
-    
-    mu = G * sun_mass
-    
-    # Mean motion
-    n = np.sqrt(mu / (a**3))
-    
-    # Mean anomaly
-    M = n * time
-    
-    # Solve Kepler's equation
-    E = kepler_equation_solver(M, e)
-    
-    # True anomaly
-    nu = 2 * np.arctan2(
-        np.sqrt(1 + e) * np.sin(E / 2),
-        np.sqrt(1 - e) * np.cos(E / 2)
-    )
-    
-    # Distance
-    r = a * (1 - e * np.cos(E))
-    
-    # Position in orbital plane
-    x_orbital = r * np.cos(nu)
-    y_orbital = r * np.sin(nu)
-    
-    # Transform to 3D space (rotation matrices)
-    # This is simplified - full transformation would use all angles
-    x = x_orbital * np.cos(Omega) - y_orbital * np.sin(Omega)
-    y = x_orbital * np.sin(Omega) + y_orbital * np.cos(Omega)
-    z = r * np.sin(nu) * np.sin(i)
-    
-    return Vector3D(x, y, z)
-
+"""
+Kepler's Laws calculations
+1. Elliptical orbits
+2. Equal area in equal time
+3. T² ∝ a³
+"""
+import math
+import numpy as np
+from typing import Tuple, Optional
+from ._kernels import njit
+from .vector3d import Vector3D
+from .constants import G, MU_SUN, AU
+
+
+def calculate_orbital_elements_batch(
+    pos: np.ndarray,
+    vel: np.ndarray,
+    sun_mass: float
+) -> dict:
+    """
+    Calculate orbital elements for many bodies at once
+    pos, vel: (N, 3) positions and velocities relative to the Sun
+    Returns a dict of (N,) arrays: a, e, i, Ω, ω, ν, period, ...
+    Angles are in degrees; periapsis/apoapsis are NaN for unbound orbits
+    """
+    mu = G * sun_mass
+    pos = np.asarray(pos, dtype=float)
+    vel = np.asarray(vel, dtype=float)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Position and velocity magnitudes
+        r = np.linalg.norm(pos, axis=1)
+        v2 = np.einsum("ij,ij->i", vel, vel)
+        
+        # Specific angular momentum
+        h_vec = np.cross(pos, vel)
+        h = np.linalg.norm(h_vec, axis=1)
+        
+        # Specific energy and semi-major axis (negative for hyperbolic orbits)
+        energy = 0.5 * v2 - mu / r
+        a = -mu / (2 * energy)
+        
+        # Eccentricity
+        e_vec = np.cross(vel, h_vec) / mu - pos / r[:, None]
+        e = np.linalg.norm(e_vec, axis=1)
+        
+        # Inclination (angle from z-axis)
+        i = np.where(h > 0, np.arccos(np.clip(h_vec[:, 2] / h, -1, 1)), 0.0)
+        
+        # Longitude of ascending node, n = z x h
+        n_vec = np.column_stack([-h_vec[:, 1], h_vec[:, 0], np.zeros_like(h)])
+        n = np.linalg.norm(n_vec, axis=1)
+        Omega = np.where(n > 0, np.arccos(np.clip(n_vec[:, 0] / n, -1, 1)), 0.0)
+        Omega = np.where(n_vec[:, 1] < 0, 2 * np.pi - Omega, Omega)
+        
+        # Argument of periapsis
+        has_omega = (n > 0) & (e > 0)
+        omega = np.arccos(np.clip(np.einsum("ij,ij->i", n_vec, e_vec) / (n * e), -1, 1))
+        omega = np.where(e_vec[:, 2] < 0, 2 * np.pi - omega, omega)
+        omega = np.where(has_omega, omega, 0.0)
+        
+        # True anomaly
+        nu = np.arccos(np.clip(np.einsum("ij,ij->i", e_vec, pos) / (e * r), -1, 1))
+        nu = np.where(np.einsum("ij,ij->i", pos, vel) < 0, 2 * np.pi - nu, nu)
+        nu = np.where(e > 0, nu, 0.0)
+        
+        # Orbital period (Kepler's third law)
+        period = np.where(a > 0, 2 * np.pi * np.sqrt(np.abs(a) ** 3 / mu), np.inf)
+        
+        bound = e < 1
+        return {
+            "semi_major_axis": a,
+            "eccentricity": e,
+            "inclination": np.degrees(i),
+            "longitude_of_ascending_node": np.degrees(Omega),
+            "argument_of_periapsis": np.degrees(omega),
+            "true_anomaly": np.degrees(nu),
+            "period": period,
+            "periapsis": np.where(bound, a * (1 - e), np.nan),
+            "apoapsis": np.where(bound, a * (1 + e), np.nan),
+            "specific_energy": energy
+        }
+
+
+def calculate_orbital_elements(
+    position: Vector3D,
+    velocity: Vector3D,
+    sun_mass: float
+) -> dict:
+    """
+    Calculate orbital elements from position and velocity
+    Returns: a, e, i, Ω, ω, ν (semi-major axis, eccentricity, inclination, etc.)
+    """
+    batch = calculate_orbital_elements_batch(
+        position.to_array()[None, :],
+        velocity.to_array()[None, :],
+        sun_mass
+    )
+    elements = {
+        key: float(values[0])
+        for key, values in batch.items()
+        if key != "specific_energy"
+    }
+    for key in ("periapsis", "apoapsis"):
+        if math.isnan(elements[key]):
+            elements[key] = None
+    return elements
+
+
+def calculate_orbital_velocity(
+    distance: float,
+    sun_mass: float,
+    circular: bool = False
+) -> float:
+    """
+    Calculate orbital velocity at given distance
+    For circular orbit: v = sqrt(G * M / r)
+    """
+    mu = G * sun_mass
+    if circular:
+        return math.sqrt(mu / distance)
+    else:
+        # For elliptical orbit, this is approximate
+        return math.sqrt(mu * (2 / distance - 1 / distance))
+
+
+@njit(cache=True)
+def kepler_equation_solver(
+    mean_anomaly: float,
+    eccentricity: float,
+    tolerance: float = 1e-10,
+    max_iterations: int = 100
+) -> float:
+    """
+    Solve Kepler's equation: M = E - e * sin(E)
+    Newton-Raphson on f(E) = E - e * sin(E) - M, f'(E) = 1 - e * cos(E)
+    Returns eccentric anomaly
+    """
+    if eccentricity < 1e-6:
+        return mean_anomaly
+    
+    # Start from M, or from the middle of M's revolution for high e
+    if eccentricity < 0.8:
+        E = mean_anomaly
+    else:
+        E = mean_anomaly - mean_anomaly % (2 * math.pi) + math.pi
+    for _ in range(max_iterations):
+        dE = (E - eccentricity * math.sin(E) - mean_anomaly) / (1 - eccentricity * math.cos(E))
+        E -= dE
+        if abs(dE) < tolerance:
+            return E
+    
+    return E
+
+
+def perifocal_to_eci_matrix(Omega: float, i: float, omega: float) -> np.ndarray:
+    """
+    Rotation from the orbital (perifocal) frame to the reference frame
+    R = R3(-Ω) R1(-i) R3(-ω), angles in radians
+    """
+    cO, sO = math.cos(Omega), math.sin(Omega)
+    ci, si = math.cos(i), math.sin(i)
+    cw, sw = math.cos(omega), math.sin(omega)
+    return np.array([
+        [cO * cw - sO * sw * ci, -cO * sw - sO * cw * ci, sO * si],
+        [sO * cw + cO * sw * ci, -sO * sw + cO * cw * ci, -cO * si],
+        [sw * si, cw * si, ci]
+    ])
+
+
+def predict_position_from_elements(
+    orbital_elements: dict,
+    time: float,
+    sun_mass: float
+) -> Vector3D:
+    """
+    Predict position from orbital elements at given time
+    Uses Kepler's equations; only defined for bound (elliptical) orbits
+    """
+    a = orbital_elements["semi_major_axis"]
+    e = orbital_elements["eccentricity"]
+    if e >= 1 or a <= 0:
+        raise ValueError(
+            f"Orbit is not bound (eccentricity={e}, semi_major_axis={a}); "
+            "Kepler's equation applies to elliptical orbits only"
+        )
+    i = math.radians(orbital_elements["inclination"])
+    Omega = math.radians(orbital_elements["longitude_of_ascending_node"])
+    omega = math.radians(orbital_elements["argument_of_periapsis"])
+    
+    mu = G * sun_mass
+    
+    # Mean motion
+    n = math.sqrt(mu / (a**3))
+    
+    # Mean anomaly
+    M = n * time
+    
+    # Solve Kepler's equation
+    E = kepler_equation_solver(M, e)
+    
+    # True anomaly
+    nu = 2 * math.atan2(
+        math.sqrt(1 + e) * math.sin(E / 2),
+        math.sqrt(1 - e) * math.cos(E / 2)
+    )
+    
+    # Distance
+    r = a * (1 - e * math.cos(E))
+    
+    # Position in orbital plane
+    x_orbital = r * math.cos(nu)
+    y_orbital = r * math.sin(nu)
+    
+    # Transform to 3D space
+    R = perifocal_to_eci_matrix(Omega, i, omega)
+    return Vector3D.from_array(R @ np.array([x_orbital, y_orbital, 0.0]))
+
+
+def solve_kepler_vec(
+    mean_anomaly: np.ndarray,
+    eccentricity: float,
+    tolerance: float = 1e-10,
+    max_iterations: int = 100
+) -> np.ndarray:
+    """
+    Vectorized kepler_equation_solver
+    Runs Newton-Raphson on all mean anomalies in lockstep
+    """
+    M = np.asarray(mean_anomaly, dtype=float)
+    if eccentricity < 1e-6:
+        return M.copy()
+    
+    if eccentricity < 0.8:
+        E = M.copy()
+    else:
+        E = M - np.mod(M, 2 * np.pi) + np.pi
+    for _ in range(max_iterations):
+        dE = (E - eccentricity * np.sin(E) - M) / (1 - eccentricity * np.cos(E))
+        E -= dE
+        if np.max(np.abs(dE), initial=0.0) < tolerance:
+            break
+    
+    return E
+
+
+def predict_position_vec(
+    orbital_elements: dict,
+    times: np.ndarray,
+    sun_mass: float
+) -> np.ndarray:
+    """
+    Vectorized predict_position_from_elements
+    Returns a (T, 3) array of positions, one row per time
+    """
+    a = orbital_elements["semi_major_axis"]
+    e = orbital_elements["eccentricity"]
+    if e >= 1 or a <= 0:
+        raise ValueError(
+            f"Orbit is not bound (eccentricity={e}, semi_major_axis={a}); "
+            "Kepler's equation applies to elliptical orbits only"
+        )
+    i = np.radians(orbital_elements["inclination"])
+    Omega = np.radians(orbital_elements["longitude_of_ascending_node"])
+    omega = np.radians(orbital_elements["argument_of_periapsis"])
+    
+    mu = G * sun_mass
+    n = np.sqrt(mu / (a**3))
+    M = n * np.asarray(times, dtype=float)
+    E = solve_kepler_vec(M, e)
+    
+    nu = 2 * np.arctan2(
+        np.sqrt(1 + e) * np.sin(E / 2),
+        np.sqrt(1 - e) * np.cos(E / 2)
+    )
+    r = a * (1 - e * np.cos(E))
+    
+    perifocal = np.column_stack([r * np.cos(nu), r * np.sin(nu), np.zeros_like(r)])
+    return perifocal @ perifocal_to_eci_matrix(Omega, i, omega).T
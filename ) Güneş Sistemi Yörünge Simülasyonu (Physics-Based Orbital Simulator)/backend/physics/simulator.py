@@ -1,193 +1,366 @@
-"""
-Orbital mechanics simulator
-Uses Verlet integration for numerical stability
-"""
-import numpy as np
-from typing import List, Optional, Callable
-from .gravity import CelestialBody, create_sun
-from .vector3d import Vector3D
-from .constants import DEFAULT_TIME_STEP, AU
-from .kepler import calculate_orbital_elements
-
-
-class OrbitalSimulator:
-    """Main simulation engine"""
-    
-    def __init__(
-        self,
-        time_step: float = DEFAULT_TIME_STEP,
-        speed_multiplier: float = 1.0
-    ):
-        self.time_step = time_step
-        self.speed_multiplier = speed_multiplier
-        self.bodies: List[CelestialBody] = []
-        self.sun = create_sun()
-        self.bodies.append(self.sun)
-        self.time = 0.0
-        self.is_running = False
-        self.trajectory_history: List[dict] = []
-        self.max_trajectory_points = 1000
-    
-    def add_body(
-        self,
-        name: str,
-        mass: float,
-        position: Vector3D,
-        velocity: Vector3D,
-        radius: float = 0.0,
-        color: str = "#ffffff"
-    ) -> CelestialBody:
-        """Add a celestial body to simulation"""
-        body = CelestialBody(name, mass, position, velocity, radius, color)
-        self.bodies.append(body)
-        return body
-    
-    def add_body_from_parameters(
-        self,
-        name: str,
-        mass: float,
-        distance_from_sun: float,  # in AU
-        initial_velocity: float,  # in m/s
-        angle: float = 0.0,  # angle in degrees
-        radius: float = 0.0,
-        color: str = "#ffffff"
-    ) -> CelestialBody:
-        """
-        Add body with simplified parameters
-        distance_from_sun: Distance in AU
-        initial_velocity: Velocity magnitude in m/s
-        angle: Initial angle in degrees (0 = right, 90 = up)
-        """
-        # Convert AU to meters
-        distance_m = distance_from_sun * AU
-        
-        # Position (in x-y plane)
-        angle_rad = np.radians(angle)
-        position = Vector3D(
-            distance_m * np.cos(angle_rad),
-            distance_m * np.sin(angle_rad),
-            0
-        )
-        
-        # Velocity (perpendicular to position for circular orbit)
-        # For stable orbit, velocity should be perpendicular
-        velocity_angle = angle_rad + np.pi / 2
-        velocity = Vector3D(
-            initial_velocity * np.cos(velocity_angle),
-            initial_velocity * np.sin(velocity_angle),
-            0
-        )
-        
-        return self.add_body(name, mass, position, velocity, radius, color)
-    
-    def step(self):
-        """Perform one simulation step using Verlet integration"""
-        if not self.is_running:
-            return
-        
-        dt = self.time_step * self.speed_multiplier
-        
-        # Calculate accelerations for all bodies
-        for body in self.bodies:
-            if body is self.sun:
-                continue
-            body.calculate_acceleration(self.bodies)
-        
-        # Update positions and velocities (Verlet integration)
-        for body in self.bodies:
-            if body is self.sun:
-                continue
-            
-            # Verlet: v(t+dt/2) = v(t) + a(t) * dt/2
-            half_velocity = body.velocity + body.acceleration * (dt / 2)
-            
-            # x(t+dt) = x(t) + v(t+dt/2) * dt
-            body.position = body.position + half_velocity * dt
-            
-            # Calculate new acceleration
-            new_acceleration = body.calculate_acceleration(self.bodies)
-            
-            # v(t+dt) = v(t+dt/2) + a(t+dt) * dt/2
-            body.velocity = half_velocity + new_acceleration * (dt / 2)
-            body.acceleration = new_acceleration
-            
-            # Store trajectory
-            if len(body.trajectory) < self.max_trajectory_points:
-                body.trajectory.append(Vector3D(body.position.x, body.position.y, body.position.z))
-            else:
-                body.trajectory.pop(0)
-                body.trajectory.append(Vector3D(body.position.x, body.position.y, body.position.z))
-        
-        self.time += dt
-        
-        # Store state for history
-        self._store_state()
-    
-    def _store_state(self):
-        """Store current state for trajectory analysis"""
-        state = {
-            "time": self.time,
-            "bodies": [body.to_dict() for body in self.bodies if body is not self.sun]
-        }
-        if len(self.trajectory_history) < self.max_trajectory_points:
-            self.trajectory_history.append(state)
-        else:
-            self.trajectory_history.pop(0)
-            self.trajectory_history.append(state)
-    
-    def start(self):
-        """Start simulation"""
-        self.is_running = True
-    
-    def stop(self):
-        """Stop simulation"""
-        self.is_running = False
-    
-    def reset(self):
-        """Reset simulation"""
-        self.time = 0.0
-        self.is_running = False
-        self.bodies = [self.sun]
-        self.trajectory_history = []
-        for body in self.bodies:
-            body.trajectory = []
-    
-    def get_state(self) -> dict:
-        """Get current simulation state"""
-        return {
-            "time": self.time,
-            "bodies": [body.to_dict() for body in self.bodies],
-            "is_running": self.is_running
-        }
-    
-    def get_orbital_elements(self, body_name: str) -> Optional[dict]:
-        """Get orbital elements for a body"""
-        body = next((b for b in self.bodies if b.name == body_name), None)
-        if not body or body is self.sun:
-            return None
-        
-        return calculate_orbital_elements(
-            body.position,
-            body.velocity,
-            self.sun.mass
-        )
-    
-    def get_energy_analysis(self) -> dict:
-        """Get energy analysis for all bodies"""
-        analysis = {}
-        for body in self.bodies:
-            if body is self.sun:
-                continue
-            
-            ke = body.get_kinetic_energy()
-            pe = body.get_potential_energy(self.sun)
-            total = body.get_total_energy(self.sun)
-            
-            analysis[body.name] = {
-                "kinetic_energy": ke,
-                "potential_energy": pe,
-                "total_energy": total
-            }
-        
-        return analysis
-
+"""
+Orbital mechanics simulator
+Uses Verlet integration for numerical stability
+Body state is kept as (N, 3) arrays and integrated with broadcasting
+"""
+import threading
+import numpy as np
+from typing import List, Optional, Callable
+from .gravity import CelestialBody, create_sun, compute_accelerations
+from .vector3d import Vector3D
+from .constants import (
+    DEFAULT_TIME_STEP, AU, G, SOFTENING_SQ,
+    BARNES_HUT_THETA, BARNES_HUT_THRESHOLD
+)
+from ._kernels import NUMBA_AVAILABLE, accel_all
+from ._cuda import CUPY_AVAILABLE, cp, accel_all as cuda_accel_all
+from .barnes_hut import barnes_hut_accelerations
+from .kepler import calculate_orbital_elements, calculate_orbital_elements_batch
+
+try:
+    from ._gravkernel import accel_all as cython_accel_all
+    CYTHON_AVAILABLE = True
+except ImportError:
+    CYTHON_AVAILABLE = False
+
+try:
+    from ._gravkernel_avx2 import accel_all as simd_accel_all, simd_level
+    SIMD_AVAILABLE = simd_level() != "scalar"
+except ImportError:
+    SIMD_AVAILABLE = False
+
+
+class OrbitalSimulator:
+    """Main simulation engine"""
+    
+    def __init__(
+        self,
+        time_step: float = DEFAULT_TIME_STEP,
+        speed_multiplier: float = 1.0,
+        theta: float = BARNES_HUT_THETA,
+        backend: str = "cpu"
+    ):
+        self.time_step = time_step
+        self.speed_multiplier = speed_multiplier
+        # Barnes-Hut opening angle, used once len(bodies) > barnes_hut_threshold
+        self.theta = theta
+        self.barnes_hut_threshold = BARNES_HUT_THRESHOLD
+        # Guards the state arrays against the background physics thread
+        self.lock = threading.RLock()
+        self.bodies: List[CelestialBody] = []
+        # Array module for the state: cupy keeps it on the GPU ("cuda" backend),
+        # falling back to numpy when CuPy is not installed
+        self.xp = cp if backend == "cuda" and CUPY_AVAILABLE else np
+        # Structure-of-arrays state, one row per body in self.bodies
+        self.pos = self.xp.empty((0, 3))
+        self.vel = self.xp.empty((0, 3))
+        self.acc = self.xp.empty((0, 3))
+        self.mass = self.xp.empty(0)
+        # G * mass, cached for the kernels; rebuilt whenever bodies change
+        self._gmass = self.xp.empty(0)
+        # Rows integrated each step (everything but the fixed Sun)
+        self._movable = np.empty(0, dtype=np.int64)
+        self._movable_xp = self.xp.asarray(self._movable)
+        self._acc_buf = self.xp.empty((0, 3))
+        self._acc_valid = False
+        self.max_trajectory_points = 1000
+        # Trajectory ring buffer (T, N, 3), on the same device as the state;
+        # hist_t holds the matching step times and hist_head the next write slot
+        self.traj = self.xp.empty((self.max_trajectory_points, 0, 3))
+        self.hist_t = np.empty(self.max_trajectory_points)
+        self.hist_head = 0
+        self.hist_len = 0
+        # Steps recorded since reset, and the step at which each row was attached
+        self._steps = 0
+        self._joined = np.empty(0, dtype=np.int64)
+        self.sun = create_sun()
+        self._attach(self.sun)
+        self.time = 0.0
+        self.is_running = False
+    
+    def add_body(
+        self,
+        name: str,
+        mass: float,
+        position: Vector3D,
+        velocity: Vector3D,
+        radius: float = 0.0,
+        color: str = "#ffffff"
+    ) -> CelestialBody:
+        """Add a celestial body to simulation"""
+        body = CelestialBody(name, mass, position, velocity, radius, color)
+        self._attach(body)
+        return body
+    
+    def _attach(self, body: CelestialBody):
+        """Append body state to the arrays and bind the body to its row"""
+        with self.lock:
+            xp = self.xp
+            self.pos = xp.vstack([self.pos, xp.asarray(body.position.to_array())])
+            self.vel = xp.vstack([self.vel, xp.asarray(body.velocity.to_array())])
+            self.acc = xp.vstack([self.acc, xp.asarray(body.acceleration.to_array())])
+            self.mass = xp.concatenate([self.mass, xp.asarray([body.mass])])
+            self._gmass = G * self.mass
+            self._acc_buf = xp.empty_like(self.acc)
+            self._acc_valid = False
+            self.traj = xp.concatenate(
+                [self.traj, xp.empty((self.max_trajectory_points, 1, 3))], axis=1
+            )
+            self._joined = np.append(self._joined, self._steps)
+            body.attach(self, len(self.bodies))
+            self.bodies.append(body)
+            self._update_movable()
+    
+    def _update_movable(self):
+        """Rebuild the index array of bodies that move"""
+        self._movable = np.array(
+            [i for i, body in enumerate(self.bodies) if body is not self.sun],
+            dtype=np.int64
+        )
+        self._movable_xp = self.xp.asarray(self._movable)
+    
+    def _clear_history(self):
+        """Restart the trajectory ring buffer"""
+        self.hist_t = np.empty(self.max_trajectory_points)
+        self.hist_head = 0
+        self.hist_len = 0
+        self._steps = 0
+        self._joined[:] = 0
+    
+    def add_body_from_parameters(
+        self,
+        name: str,
+        mass: float,
+        distance_from_sun: float,  # in AU
+        initial_velocity: float,  # in m/s
+        angle: float = 0.0,  # angle in degrees
+        radius: float = 0.0,
+        color: str = "#ffffff"
+    ) -> CelestialBody:
+        """
+        Add body with simplified parameters
+        distance_from_sun: Distance in AU
+        initial_velocity: Velocity magnitude in m/s
+        angle: Initial angle in degrees (0 = right, 90 = up)
+        """
+        # Convert AU to meters
+        distance_m = distance_from_sun * AU
+        
+        # Position (in x-y plane)
+        angle_rad = np.radians(angle)
+        position = Vector3D(
+            distance_m * np.cos(angle_rad),
+            distance_m * np.sin(angle_rad),
+            0
+        )
+        
+        # Velocity (perpendicular to position for circular orbit)
+        # For stable orbit, velocity should be perpendicular
+        velocity_angle = angle_rad + np.pi / 2
+        velocity = Vector3D(
+            initial_velocity * np.cos(velocity_angle),
+            initial_velocity * np.sin(velocity_angle),
+            0
+        )
+        
+        return self.add_body(name, mass, position, velocity, radius, color)
+    
+    def _compute_accelerations(self) -> np.ndarray:
+        """Pairwise gravity for the current positions"""
+        if self.xp is not np:
+            cuda_accel_all(self.pos, self._gmass, SOFTENING_SQ, self._acc_buf)
+            return self._acc_buf
+        if NUMBA_AVAILABLE and len(self.bodies) > self.barnes_hut_threshold:
+            return barnes_hut_accelerations(
+                self.pos, self.mass, self.theta, out=self._acc_buf
+            )
+        # Cython's third-law kernel beats the full N^2 SIMD sweep from about
+        # 24 bodies up; below that every compiled kernel is within ~0.2 us
+        if CYTHON_AVAILABLE:
+            cython_accel_all(self.pos, self._gmass, SOFTENING_SQ, self._acc_buf)
+            return self._acc_buf
+        if SIMD_AVAILABLE:
+            simd_accel_all(self.pos, self._gmass, SOFTENING_SQ, self._acc_buf)
+            return self._acc_buf
+        if NUMBA_AVAILABLE:
+            accel_all(self.pos, self._gmass, SOFTENING_SQ, self._acc_buf)
+            return self._acc_buf
+        return compute_accelerations(self.pos, self.mass)
+    
+    def _host(self, arr):
+        """State array as a NumPy array (copied back from the GPU if needed)"""
+        return arr if self.xp is np else arr.get()
+    
+    def step(self):
+        """Perform one simulation step using velocity Verlet integration"""
+        with self.lock:
+            if not self.is_running:
+                return
+        
+            dt = self.time_step * self.speed_multiplier
+            movable = self._movable_xp
+        
+            # a(t) carries over from the previous step; only computed on the first one
+            if not self._acc_valid:
+                self.acc[movable] = self._compute_accelerations()[movable]
+                self._acc_valid = True
+        
+            # Velocity Verlet: v(t+dt/2) = v(t) + a(t) * dt/2
+            self.vel[movable] += self.acc[movable] * (dt / 2)
+        
+            # x(t+dt) = x(t) + v(t+dt/2) * dt
+            self.pos[movable] += self.vel[movable] * dt
+        
+            # a(t+dt) - the single force evaluation of this step
+            self.acc[movable] = self._compute_accelerations()[movable]
+        
+            # v(t+dt) = v(t+dt/2) + a(t+dt) * dt/2
+            self.vel[movable] += self.acc[movable] * (dt / 2)
+        
+            # Store trajectory - a device-side copy, no transfer to the host
+            self.traj[self.hist_head] = self.pos
+        
+            self.time += dt
+            self.hist_t[self.hist_head] = self.time
+            self.hist_head = (self.hist_head + 1) % self.max_trajectory_points
+            self.hist_len = min(self.max_trajectory_points, self.hist_len + 1)
+            self._steps += 1
+    
+    def start(self):
+        """Start simulation"""
+        self.is_running = True
+    
+    def stop(self):
+        """Stop simulation"""
+        self.is_running = False
+    
+    def reset(self):
+        """Reset simulation"""
+        with self.lock:
+            self.time = 0.0
+            self.is_running = False
+            for body in self.bodies:
+                if body is not self.sun:
+                    body.detach()
+            self.bodies = [self.sun]
+            self._update_movable()
+            self.pos = self.pos[:1].copy()
+            self.vel = self.vel[:1].copy()
+            self.acc = self.acc[:1].copy()
+            self.mass = self.mass[:1].copy()
+            self._gmass = G * self.mass
+            self._acc_buf = self.xp.empty_like(self.acc)
+            self._acc_valid = False
+            self.traj = self.traj[:, :1].copy()
+            self._joined = self._joined[:1].copy()
+            self._clear_history()
+    
+    def get_state(self) -> dict:
+        """Get current simulation state"""
+        with self.lock:
+            return {
+                "time": self.time,
+                "bodies": self._serialize_bodies(),
+                "is_running": self.is_running
+            }
+    
+    def _serialize_bodies(self) -> List[dict]:
+        """Body dictionaries built straight from the state arrays"""
+        return [
+            {
+                "name": body.name,
+                "mass": m,
+                "position": {"x": p[0], "y": p[1], "z": p[2]},
+                "velocity": {"x": v[0], "y": v[1], "z": v[2]},
+                "radius": body.radius,
+                "color": body.color,
+                "acceleration": {"x": a[0], "y": a[1], "z": a[2]}
+            }
+            for body, m, p, v, a in zip(
+                self.bodies,
+                self._host(self.mass).tolist(),
+                self._host(self.pos).tolist(),
+                self._host(self.vel).tolist(),
+                self._host(self.acc).tolist()
+            )
+        ]
+    
+    def _recent_slots(self, count: int, window: Optional[int] = None) -> np.ndarray:
+        """Ring slots of the last min(window, count) steps, oldest first"""
+        n = count if window is None else min(max(window, 0), count)
+        return (np.arange(n) + self.hist_head - n) % self.max_trajectory_points
+    
+    def trajectory_array(self, index: int, window: Optional[int] = None) -> np.ndarray:
+        """Recorded positions of row `index`, oldest first, as a host (n, 3) array"""
+        with self.lock:
+            # The Sun is fixed; like get_history, report no trajectory for it
+            if self.bodies[index] is self.sun:
+                return np.empty((0, 3))
+            count = min(self.hist_len, self._steps - int(self._joined[index]))
+            slots = self.xp.asarray(self._recent_slots(count, window))
+            return self._host(self.traj[slots, index])
+    
+    def get_history(self, window: Optional[int] = None) -> dict:
+        """
+        Last `window` steps (all recorded if None), oldest first, built on
+        demand from the trajectory ring buffer. A body added mid-run has
+        fewer positions than there are times; both lists end at the latest step.
+        """
+        with self.lock:
+            order = self._recent_slots(self.hist_len, window)
+            n = len(order)
+            # One gather and one host transfer for all movable bodies
+            block = self._host(self.traj[self.xp.asarray(order)][:, self._movable_xp])
+            counts = np.minimum(n, self._steps - self._joined[self._movable])
+            return {
+                "times": self.hist_t[order].tolist(),
+                "bodies": [
+                    {
+                        "name": self.bodies[i].name,
+                        "positions": [
+                            {"x": x, "y": y, "z": z}
+                            for x, y, z in block[n - c:, k].tolist()
+                        ]
+                    }
+                    for k, (i, c) in enumerate(zip(self._movable, counts.tolist()))
+                ]
+            }
+    
+    def get_orbital_elements(self, body_name: str) -> Optional[dict]:
+        """Get orbital elements for a body"""
+        with self.lock:
+            body = next((b for b in self.bodies if b.name == body_name), None)
+            if not body or body is self.sun:
+                return None
+        
+            return calculate_orbital_elements(
+                body.position,
+                body.velocity,
+                self.sun.mass
+            )
+    
+    def get_energy_analysis(self) -> dict:
+        """Get energy analysis for all bodies"""
+        with self.lock:
+            idx = self._movable
+            names = [self.bodies[i].name for i in idx]
+            pos = self._host(self.pos)
+            vel = self._host(self.vel)
+            mass = self._host(self.mass)[idx]
+            # The Sun is always row 0
+            rel_pos = pos[idx] - pos[0]
+            rel_vel = vel[idx] - vel[0]
+        
+        elements = calculate_orbital_elements_batch(rel_pos, rel_vel, self.sun.mass)
+        ke = 0.5 * mass * np.einsum("ij,ij->i", rel_vel, rel_vel)
+        total = mass * elements["specific_energy"]
+        pe = total - ke
+        
+        return {
+            name: {
+                "kinetic_energy": k,
+                "potential_energy": p,
+                "total_energy": t
+            }
+            for name, k, p, t in zip(names, ke.tolist(), pe.tolist(), total.tolist())
+        }
@@ -0,0 +1,35 @@
+"""
+Optional compiled gravity kernels
+Build in place with: python setup.py build_ext --inplace
+The Cython kernel needs Cython; without it only the C extension is built.
+The simulator falls back to Numba / NumPy when they are not built
+"""
+from setuptools import setup, Extension
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    cythonize = None
+
+ext_modules = [
+    # Plain C; SIMD paths are selected at runtime, so no -march flag
+    Extension(
+        "physics._gravkernel_avx2",
+        ["physics/gravkernel_avx2.c"],
+        extra_compile_args=["-O3"]
+    )
+]
+
+if cythonize is not None:
+    ext_modules += cythonize([
+        Extension(
+            "physics._gravkernel",
+            ["physics/_gravkernel.pyx"],
+            extra_compile_args=["-O3", "-ffast-math", "-march=native"]
+        )
+    ])
+
+setup(
+    name="orbital-simulator-kernels",
+    ext_modules=ext_modules
+)